@@ -1,17 +1,26 @@
 import asyncio
-import json
+import hashlib
 import logging
+import os
+import re
+import sys
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Dict, Any
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+from fastapi import Depends, FastAPI, Request, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, ORJSONResponse, Response
 from pydantic import BaseModel
 import httpx
+import orjson
+import msgpack
+import aiosqlite
+from garak import _plugins
 import uuid
 from contextlib import asynccontextmanager
+from functools import lru_cache, partial
+from itertools import chain
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -20,27 +29,56 @@ logger = logging.getLogger(__name__)
 # Data directory for scan results
 DATA_DIR = Path("./data")
 DATA_DIR.mkdir(exist_ok=True)
+SCANS_DB = DATA_DIR / "scans.db"
+OLLAMA_BASE_URL = "http://localhost:11434"
+
+# Uvicorn worker processes. One is plenty for a local single-user GUI; each
+# extra worker runs its own startup (including the plugin walk) and keeps its
+# own caches. On Windows uvicorn's multi-process mode uses a selector event
+# loop, which can't spawn the Garak subprocesses, so keep it at 1 there.
+WORKERS = int(os.environ.get("GARAK_GUI_WORKERS", 1))
+
+# Garak scans run as child processes; cap how many run at once, sharing
+# the CPUs between workers
+SCAN_SEMAPHORE = asyncio.Semaphore(max(1, (os.cpu_count() or 1) // WORKERS))
+# Max bytes buffered for a single line of Garak output; longer lines are
+# forwarded in pieces
+GARAK_OUTPUT_LIMIT = 1024 * 1024
+# Bytes read from Garak's output per chunk
+GARAK_READ_SIZE = 64 * 1024
+# Min seconds between forwarded progress-bar redraws
+GARAK_REDRAW_INTERVAL = 0.5
+# Window (seconds) in which WebSocket scan frames are coalesced
+FRAME_FLUSH_INTERVAL = 0.05
+# Scan history writes: queue bound, max rows per transaction, batch window (s)
+SCAN_WRITE_QUEUE_SIZE = 1000
+SCAN_WRITE_BATCH = 100
+SCAN_WRITE_INTERVAL = 0.05
+# WebSocket subprotocols a client can request for scan frames; clients
+# that don't ask for one get UTF-8 JSON
+WS_ENCODERS: Dict[str, Callable[[Any], bytes]] = {
+    "msgpack": partial(msgpack.packb, use_bin_type=True),
+}
+# Max concurrent scan WebSocket connections
+MAX_WS_CONNECTIONS = 64
+# Legacy JSON scan history, imported into SCANS_DB on first startup
 SCANS_FILE = DATA_DIR / "scans.json"
 
-# Initialize scans storage
-if not SCANS_FILE.exists():
-    SCANS_FILE.write_text("[]")
-
 
 class OllamaClient:
     """Client for interacting with Ollama API"""
     
-    def __init__(self, base_url: str = "http://localhost:11434"):
-        self.base_url = base_url
+    def __init__(self, client: httpx.AsyncClient):
+        # Shared, long-lived client so connections are pooled across calls
+        self.client = client
     
     async def list_models(self) -> List[Dict[str, Any]]:
         """List all available models from Ollama"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/api/tags")
-                response.raise_for_status()
-                data = response.json()
-                return data.get("models", [])
+            response = await self.client.get("/api/tags")
+            response.raise_for_status()
+            data = response.json()
+            return data.get("models", [])
         except Exception as e:
             logger.error(f"Error listing Ollama models: {e}")
             return []
@@ -48,106 +86,176 @@ class OllamaClient:
     async def check_connection(self) -> bool:
         """Check if Ollama is running"""
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(f"{self.base_url}/api/tags", timeout=2.0)
-                return response.status_code == 200
+            response = await self.client.get("/api/tags", timeout=2.0)
+            return response.status_code == 200
         except:
             return False
 
 
+# Line terminators in Garak output ('\r\n' counts as one)
+_LINE_END = re.compile(rb"\r\n|\n|\r")
+
+# Plugin path prefixes stripped to get CLI-friendly names, per category:
+# full Python path ('garak.probes.dan.DAN_Jailbreak') and plugin path from
+# enumerate_plugins ('probes.dan.DAN_Jailbreak')
+_PLUGIN_PREFIXES = {
+    "probes": ("garak.probes.", "probes."),
+    "detectors": ("garak.detectors.", "detectors."),
+}
+
+
+@lru_cache(maxsize=1024)
+def normalize_plugin_name(name: str, category: str) -> str:
+    """
+    Convert things like:
+      - 'probes.dan.DAN_Jailbreak'
+      - 'garak.probes.dan.DAN_Jailbreak'
+      - 'detectors.dan.DANJailbreak'
+    into CLI-friendly forms like 'dan.DAN_Jailbreak'.
+    Names already in CLI style (e.g. 'dan') are returned unchanged.
+    """
+    full_prefix, short_prefix = _PLUGIN_PREFIXES[category]
+    return name.removeprefix(full_prefix).removeprefix(short_prefix)
+
+
+class ScanFrameSender:
+    """Sends scan frames over a WebSocket, coalescing bursts into one message
+
+    Frames queued within FRAME_FLUSH_INTERVAL of each other are sent as a
+    single array; pass flush=True for frames that must go out now.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        encode: Callable[[Any], bytes] = orjson.dumps
+    ):
+        self.websocket = websocket
+        self.encode = encode
+        self.pending: List[Dict[str, Any]] = []
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def send(self, frame: Dict[str, Any], flush: bool = False):
+        if self._error:
+            raise self._error
+        self.pending.append(frame)
+        if flush:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def flush(self):
+        async with self._lock:
+            if not self.pending:
+                return
+            frames, self.pending = self.pending, []
+            payload = frames[0] if len(frames) == 1 else frames
+            await self.websocket.send_bytes(self.encode(payload))
+
+    async def _flush_later(self):
+        await asyncio.sleep(FRAME_FLUSH_INTERVAL)
+        self._timer = None
+        try:
+            await self.flush()
+        except Exception as e:
+            # Surface send failures (e.g. disconnects) on the next send()
+            self._error = e
+
+    def close(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+
 class GarakRunner:
     """Runner for Garak scans"""
 
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_available_probes() -> List[Dict[str, Any]]:
-        """Get list of available Garak probes"""
-        try:
-            from garak import _plugins
+        """Get list of available Garak probes (enumerated once, then cached)
 
-            probe_list: List[Dict[str, Any]] = []
+        Errors propagate so that a failed enumeration is not cached.
+        """
+        probe_list: List[Dict[str, Any]] = []
 
-            # enumerate_plugins returns (path: str, is_default: bool)
-            for path, is_default in _plugins.enumerate_plugins("probes"):
+        # enumerate_plugins returns (path: str, is_default: bool)
+        for path, is_default in _plugins.enumerate_plugins("probes"):
+            try:
+                # Optional: get nicer metadata for display
+                info = {}
                 try:
-                    # Optional: get nicer metadata for display
+                    info = _plugins.plugin_info(path)
+                except Exception:
+                    # If plugin_info fails we still want to return something
                     info = {}
-                    try:
-                        info = _plugins.plugin_info(path)
-                    except Exception:
-                        # If plugin_info fails we still want to return something
-                        info = {}
-
-                    # path is an opaque plugin identifier; keep it as-is for CLI
-                    # e.g. "probes.promptinject.AutoDAN" or similar
-                    description = (
-                        info.get("description")
-                        or info.get("goal")
-                        or f"Probe: {path}"
-                    )
-
-                    probe_list.append(
-                        {
-                            # Full plugin path â€“ use this when calling garak
-                            "id": path,
-                            # Keep these fields so existing frontend code that uses
-                            # probe.name / probe.module keeps working
-                            "name": path,
-                            "module": path,
-                            "description": description,
-                            "active_by_default": bool(is_default),
-                            # Optional extra metadata for nicer UI
-                            "tags": info.get("tags") or [],
-                        }
-                    )
-                except Exception as e:
-                    logger.warning(f"Could not load probe {path}: {e}")
 
-            return probe_list
+                # path is an opaque plugin identifier; keep it as-is for CLI
+                # e.g. "probes.promptinject.AutoDAN" or similar
+                description = (
+                    info.get("description")
+                    or info.get("goal")
+                    or f"Probe: {path}"
+                )
+
+                probe_list.append(
+                    {
+                        # Full plugin path â€“ use this when calling garak
+                        "id": path,
+                        # Keep these fields so existing frontend code that uses
+                        # probe.name / probe.module keeps working
+                        "name": path,
+                        "module": path,
+                        "description": description,
+                        "active_by_default": bool(is_default),
+                        # Optional extra metadata for nicer UI
+                        "tags": info.get("tags") or [],
+                    }
+                )
+            except Exception as e:
+                logger.warning(f"Could not load probe {path}: {e}")
 
-        except Exception as e:
-            logger.error(f"Error getting probes: {e}")
-            return []
+        return probe_list
     
     @staticmethod
+    @lru_cache(maxsize=None)
     def get_available_detectors() -> List[Dict[str, Any]]:
-        """Get list of available Garak detectors"""
-        try:
-            from garak import _plugins
+        """Get list of available Garak detectors (enumerated once, then cached)
 
-            detector_list: List[Dict[str, Any]] = []
+        Errors propagate so that a failed enumeration is not cached.
+        """
+        detector_list: List[Dict[str, Any]] = []
 
-            for path, is_default in _plugins.enumerate_plugins("detectors"):
+        for path, is_default in _plugins.enumerate_plugins("detectors"):
+            try:
+                info = {}
                 try:
+                    info = _plugins.plugin_info(path)
+                except Exception:
                     info = {}
-                    try:
-                        info = _plugins.plugin_info(path)
-                    except Exception:
-                        info = {}
-
-                    description = (
-                        info.get("description")
-                        or info.get("goal")
-                        or f"Detector: {path}"
-                    )
 
-                    detector_list.append(
-                        {
-                            "id": path,
-                            "name": path,
-                            "module": path,
-                            "description": description,
-                            "active_by_default": bool(is_default),
-                            "tags": info.get("tags") or [],
-                        }
-                    )
-                except Exception as e:
-                    logger.warning(f"Could not load detector {path}: {e}")
+                description = (
+                    info.get("description")
+                    or info.get("goal")
+                    or f"Detector: {path}"
+                )
+
+                detector_list.append(
+                    {
+                        "id": path,
+                        "name": path,
+                        "module": path,
+                        "description": description,
+                        "active_by_default": bool(is_default),
+                        "tags": info.get("tags") or [],
+                    }
+                )
+            except Exception as e:
+                logger.warning(f"Could not load detector {path}: {e}")
 
-            return detector_list
-
-        except Exception as e:
-            logger.error(f"Error getting detectors: {e}")
-            return []
+        return detector_list
 
     
     @staticmethod
@@ -156,54 +264,29 @@ class GarakRunner:
         probes: List[str],
         detectors: Optional[List[str]],
         websocket: WebSocket,
-        scan_id: str
+        scan_id: str,
+        encode: Callable[[Any], bytes] = orjson.dumps
     ) -> Optional[Dict[str, Any]]:
         """Run a Garak scan with the specified configuration and return results"""
         results = None  # Initialize results at function scope
+        sender = ScanFrameSender(websocket, encode)
         
         try:
-            await websocket.send_json({
+            await sender.send({
                 "type": "status",
                 "message": f"Starting scan on model: {model_name}",
                 "progress": 0
             })
             
-            # Import garak
-            import garak
-            from garak import cli
-            
-            def normalize_plugin_name(name: str, category: str) -> str:
-                """
-                Convert things like:
-                  - 'probes.dan.DAN_Jailbreak'
-                  - 'garak.probes.dan.DAN_Jailbreak'
-                  - 'detectors.dan.DANJailbreak'
-                into CLI-friendly forms like 'dan.DAN_Jailbreak'.
-                """
-                # full Python path, e.g. 'garak.probes.dan.DAN_Jailbreak'
-                full_prefix = f"garak.{category}."
-                if name.startswith(full_prefix):
-                    return name[len(full_prefix):]
-
-                # plugin path from enumerate_plugins, e.g. 'probes.dan.DAN_Jailbreak'
-                short_prefix = f"{category}."
-                if name.startswith(short_prefix):
-                    return name[len(short_prefix):]
-
-                # already CLI-style (e.g. 'dan.DAN_Jailbreak' or 'dan')
-                return name
-
             # Prepare Garak arguments
-            probe_args = []
-            for probe in probes:
-                cli_name = normalize_plugin_name(probe, "probes")
-                probe_args.extend(["--probes", cli_name])
-
-            detector_args = []
-            if detectors:
-                for detector in detectors:
-                    cli_name = normalize_plugin_name(detector, "detectors")
-                    detector_args.extend(["--detectors", cli_name])
+            probe_args = list(chain.from_iterable(
+                ("--probes", normalize_plugin_name(probe, "probes"))
+                for probe in probes
+            ))
+            detector_args = list(chain.from_iterable(
+                ("--detectors", normalize_plugin_name(detector, "detectors"))
+                for detector in detectors or ()
+            ))
             
              # Create output directory for this scan (under backend/data/<scan_id>)
             output_dir = DATA_DIR / scan_id
@@ -222,62 +305,176 @@ class GarakRunner:
                 "--report_prefix", str(report_prefix),
             ]
             
-            await websocket.send_json({
+            await sender.send({
                 "type": "status",
                 "message": "Initializing Garak...",
                 "progress": 10
             })
             
-            # Run Garak scan in a separate thread to avoid blocking
-            loop = asyncio.get_event_loop()
-            
-            def run_garak():
-                try:
-                    cli.main(args)
-                    return True
-                except Exception as e:
-                    logger.error(f"Garak scan error: {e}")
-                    return False
-            
-            await websocket.send_json({
+            await sender.send({
                 "type": "status",
                 "message": "Running scan...",
                 "progress": 20
-            })
+            }, flush=True)
             
-            # Run the scan
-            success = await loop.run_in_executor(None, run_garak)
+            # Run Garak in its own interpreter so scans don't contend for
+            # the GIL and can be terminated if the client goes away
+            async with SCAN_SEMAPHORE:
+                proc = await asyncio.create_subprocess_exec(
+                    sys.executable, "-m", "garak", *args,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.STDOUT,
+                )
+                output = asyncio.create_task(
+                    GarakRunner.forward_output(proc, sender)
+                )
+                client = asyncio.create_task(
+                    GarakRunner.wait_for_disconnect(websocket)
+                )
+                try:
+                    await asyncio.wait(
+                        {output, client}, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not output.done():
+                        raise WebSocketDisconnect(client.result())
+                    returncode = output.result()
+                finally:
+                    output.cancel()
+                    client.cancel()
+                    if proc.returncode is None:
+                        logger.info(f"Terminating Garak scan {scan_id}")
+                        proc.terminate()
+                        await proc.wait()
+            
+            success = returncode == 0
+            if not success:
+                logger.error(f"Garak scan {scan_id} exited with code {returncode}")
             
             if success:
-                await websocket.send_json({
+                await sender.send({
                     "type": "status",
                     "message": "Scan completed successfully!",
                     "progress": 100
                 })
                 
-                # Parse results
-                results = GarakRunner.parse_results(output_dir, scan_id)
+                # Parse results off the event loop; reports can be large
+                results = await asyncio.to_thread(
+                    GarakRunner.parse_results, output_dir, scan_id
+                )
                 
-                await websocket.send_json({
+                await sender.send({
                     "type": "complete",
                     "scan_id": scan_id,
                     "results": results
-                })
+                }, flush=True)
             else:
-                await websocket.send_json({
+                await sender.send({
                     "type": "error",
                     "message": "Scan failed. Check logs for details."
-                })
+                }, flush=True)
                 
+        except WebSocketDisconnect:
+            raise
         except Exception as e:
             logger.error(f"Error running scan: {e}")
-            await websocket.send_json({
+            await sender.send({
                 "type": "error",
                 "message": f"Scan error: {str(e)}"
-            })
+            }, flush=True)
+        finally:
+            sender.close()
         
         return results  # Return results so they can be saved
     
+    @staticmethod
+    async def forward_output(
+        proc: asyncio.subprocess.Process,
+        sender: ScanFrameSender
+    ) -> int:
+        """Forward Garak's output as log frames and return its exit code
+
+        Output is split into lines by hand: progress bars redraw with a
+        carriage return and never end the line, so readline() would buffer
+        them without bound. Redraws are forwarded at most once per
+        GARAK_REDRAW_INTERVAL.
+        """
+        loop = asyncio.get_running_loop()
+        buffer = b""
+        redraw = None
+        last_redraw = 0.0
+        while True:
+            chunk = await proc.stdout.read(GARAK_READ_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+            
+            lines = []
+            start = 0
+            for match in _LINE_END.finditer(buffer):
+                if match.group() == b"\r" and match.end() == len(buffer):
+                    # May be the first half of a '\r\n' split across reads;
+                    # keep it buffered until the next chunk shows which
+                    break
+                segment = buffer[start:match.start()]
+                start = match.end()
+                if match.group() == b"\r":
+                    redraw = segment
+                else:
+                    # A finished line supersedes any pending redraw
+                    lines.append(segment)
+                    redraw = None
+            buffer = buffer[start:]
+            if len(buffer) > GARAK_OUTPUT_LIMIT:
+                lines.append(buffer)
+                buffer = b""
+            if redraw is not None and loop.time() - last_redraw >= GARAK_REDRAW_INTERVAL:
+                lines.append(redraw)
+                redraw = None
+                last_redraw = loop.time()
+            
+            for line in lines:
+                await GarakRunner._send_log(sender, line)
+        
+        for line in (redraw, buffer):
+            if line:
+                await GarakRunner._send_log(sender, line)
+        return await proc.wait()
+    
+    @staticmethod
+    async def wait_for_disconnect(websocket: WebSocket) -> int:
+        """Wait for the client to disconnect and return the close code
+
+        Anything else the client sends mid-scan is ignored.
+        """
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return message.get("code", 1000)
+    
+    @staticmethod
+    async def _send_log(sender: ScanFrameSender, line: bytes):
+        message = line.decode(errors="replace").strip()
+        if message:
+            await sender.send({
+                "type": "log",
+                "message": message
+            })
+    
+    @staticmethod
+    def find_report_files(output_dir: Path) -> Tuple[List[Path], List[Path]]:
+        """Return the (JSONL, HTML) report files in a scan directory"""
+        jsonl_files: List[Path] = []
+        html_files: List[Path] = []
+        for entry in output_dir.iterdir():
+            name = entry.name
+            if not name.startswith("report"):
+                continue
+            if name.endswith(".jsonl"):
+                jsonl_files.append(entry)
+            elif name.endswith(".html"):
+                html_files.append(entry)
+        return jsonl_files, html_files
+    
     @staticmethod
     def parse_results(output_dir: Path, scan_id: str) -> Dict[str, Any]:
         """Parse Garak output files"""
@@ -285,25 +482,30 @@ class GarakRunner:
             "summary": {},
             "details": [],
             "report_html": None,
-            "report_path": None
+            "report_path": None,
+            "report_html_path": None
         }
         
-        # Look for report files
-        for file in output_dir.glob("report*.jsonl"):
+        jsonl_files, html_files = GarakRunner.find_report_files(output_dir)
+        
+        # Look for report files; read as bytes so orjson decodes each line
+        # without an intermediate str
+        for file in jsonl_files:
             try:
-                with open(file, 'r') as f:
+                details = results["details"]
+                with open(file, 'rb') as f:
                     for line in f:
                         if line.strip():
-                            data = json.loads(line)
-                            results["details"].append(data)
+                            details.append(orjson.loads(line))
             except Exception as e:
                 logger.error(f"Error parsing {file}: {e}")
         
         # Look for HTML report
-        html_files = list(output_dir.glob("report*.html"))
         if html_files:
             results["report_html"] = html_files[0].name
             results["report_path"] = f"/api/scans/{scan_id}/report"
+            # Absolute path, so serving the report needs no directory scan
+            results["report_html_path"] = str(html_files[0].resolve())
         
         return results
 
@@ -327,8 +529,172 @@ class ScanRecord(BaseModel):
     results: Optional[Dict[str, Any]] = None
 
 
+# Scan history storage (SQLite, one row per scan)
+async def init_db() -> aiosqlite.Connection:
+    """Open the scan database and create the schema if needed"""
+    db = await aiosqlite.connect(SCANS_DB)
+    await db.execute("PRAGMA journal_mode=WAL")
+    await db.execute("PRAGMA synchronous=NORMAL")
+    await db.execute(
+        "CREATE TABLE IF NOT EXISTS scans ("
+        "id TEXT PRIMARY KEY, ts TEXT, model TEXT, payload BLOB)"
+    )
+    await db.execute("CREATE INDEX IF NOT EXISTS scans_ts ON scans (ts)")
+    await db.commit()
+
+    # Import history from the old scans.json, if any
+    if SCANS_FILE.exists():
+        try:
+            legacy = orjson.loads(SCANS_FILE.read_bytes())
+            await db.executemany(
+                "INSERT OR IGNORE INTO scans (id, ts, model, payload) VALUES (?, ?, ?, ?)",
+                [
+                    (s["id"], s.get("timestamp"), s.get("model_name"), orjson.dumps(s))
+                    for s in legacy
+                ],
+            )
+            await db.commit()
+            SCANS_FILE.replace(SCANS_FILE.with_suffix(".json.migrated"))
+            logger.info(f"Imported {len(legacy)} scans from {SCANS_FILE}")
+        except FileNotFoundError:
+            # Another worker already imported it
+            pass
+        except Exception as e:
+            logger.error(f"Error importing {SCANS_FILE}: {e}")
+
+    return db
+
+
+async def load_scans() -> List[Dict]:
+    """Load scan history, newest first"""
+    async with app.state.db.execute(
+        "SELECT payload FROM scans ORDER BY ts DESC"
+    ) as cursor:
+        return [orjson.loads(row[0]) async for row in cursor]
+
+
+async def get_scan_record(scan_id: str) -> Optional[Dict]:
+    """Load a single scan record by id"""
+    async with app.state.db.execute(
+        "SELECT payload FROM scans WHERE id = ?", (scan_id,)
+    ) as cursor:
+        row = await cursor.fetchone()
+    return orjson.loads(row[0]) if row else None
+
+
+async def save_scan(scan: Dict):
+    """Save a new or updated scan record
+
+    Writes are queued for the background writer. Once shutdown has begun
+    the record is written directly instead, so late writes are not lost.
+    """
+    # Serialize now so later mutations of the dict don't leak into the row
+    row = (scan["id"], scan["timestamp"], scan["model_name"], orjson.dumps(scan))
+    if app.state.accepting_writes:
+        await app.state.scan_writes.put(row)
+    else:
+        await write_scan_rows(app.state.db, [row])
+
+
+async def write_scan_rows(db: aiosqlite.Connection, rows: List[tuple]):
+    """Insert or update scan rows in one transaction"""
+    try:
+        await db.executemany(
+            "INSERT INTO scans (id, ts, model, payload) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET payload = excluded.payload",
+            rows,
+        )
+        await db.commit()
+    except Exception as e:
+        logger.error(f"Error writing {len(rows)} scan records: {e}")
+
+
+async def scan_writer(db: aiosqlite.Connection, queue: asyncio.Queue):
+    """Background task that owns all scan history writes
+
+    Rows queued within SCAN_WRITE_INTERVAL of each other (up to
+    SCAN_WRITE_BATCH) are written in one transaction. A None item stops it.
+    """
+    loop = asyncio.get_running_loop()
+    stopping = False
+    while not stopping:
+        row = await queue.get()
+        if row is None:
+            break
+        batch = {row[0]: row}
+        deadline = loop.time() + SCAN_WRITE_INTERVAL
+        while len(batch) < SCAN_WRITE_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                row = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if row is None:
+                stopping = True
+                break
+            # Only the latest state of each scan needs writing
+            batch[row[0]] = row
+        
+        await write_scan_rows(db, list(batch.values()))
+
+
+# Dependency providers: one instance each for the app's lifetime
+@lru_cache
+def get_http_client() -> httpx.AsyncClient:
+    """Shared, pooled HTTP client for Ollama (closed on shutdown)"""
+    return httpx.AsyncClient(
+        base_url=OLLAMA_BASE_URL,
+        timeout=5.0,
+        limits=httpx.Limits(max_keepalive_connections=20),
+    )
+
+
+@lru_cache
+def get_ollama() -> OllamaClient:
+    return OllamaClient(get_http_client())
+
+
+@lru_cache
+def get_garak_runner() -> GarakRunner:
+    return GarakRunner()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.db = await init_db()
+    app.state.scan_writes = asyncio.Queue(maxsize=SCAN_WRITE_QUEUE_SIZE)
+    app.state.accepting_writes = True
+    app.state.writer_task = asyncio.create_task(
+        scan_writer(app.state.db, app.state.scan_writes)
+    )
+    # Enumerate Garak plugins once up front so the first /api/probes and
+    # /api/detectors requests are served from cache
+    await load_plugin_list(GarakRunner.get_available_probes, refresh=False)
+    await load_plugin_list(GarakRunner.get_available_detectors, refresh=False)
+    try:
+        yield
+    finally:
+        if get_http_client.cache_info().currsize:
+            await get_http_client().aclose()
+        get_ollama.cache_clear()
+        get_http_client.cache_clear()
+        # Route new writes around the queue, then let the writer drain
+        # pending records before closing the database
+        app.state.accepting_writes = False
+        await app.state.scan_writes.put(None)
+        await app.state.writer_task
+        await app.state.db.close()
+
+
 # FastAPI app
-app = FastAPI(title="Garak GUI", version="1.0.0")
+app = FastAPI(
+    title="Garak GUI",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
+)
 
 # CORS middleware
 app.add_middleware(
@@ -339,29 +705,8 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize clients
-ollama_client = OllamaClient()
-garak_runner = GarakRunner()
-
 # Active WebSocket connections
-active_connections: List[WebSocket] = []
-
-
-def load_scans() -> List[Dict]:
-    """Load scan history from file"""
-    try:
-        with open(SCANS_FILE, 'r') as f:
-            return json.load(f)
-    except:
-        return []
-
-
-def save_scan(scan: Dict):
-    """Save a scan record"""
-    scans = load_scans()
-    scans.append(scan)
-    with open(SCANS_FILE, 'w') as f:
-        json.dump(scans, f, indent=2)
+active_connections: Set[WebSocket] = set()
 
 
 @app.get("/")
@@ -370,9 +715,9 @@ async def root():
 
 
 @app.get("/api/health")
-async def health_check():
+async def health_check(ollama: OllamaClient = Depends(get_ollama)):
     """Check health of the API and Ollama connection"""
-    ollama_status = await ollama_client.check_connection()
+    ollama_status = await ollama.check_connection()
     return {
         "api": "healthy",
         "ollama": "connected" if ollama_status else "disconnected"
@@ -380,38 +725,96 @@ async def health_check():
 
 
 @app.get("/api/models")
-async def list_models():
+async def list_models(ollama: OllamaClient = Depends(get_ollama)):
     """List available Ollama models"""
-    models = await ollama_client.list_models()
+    models = await ollama.list_models()
     return {"models": models}
 
 
+# ETags of the cached plugin lists, keyed by their getter
+_PLUGIN_ETAGS: Dict[Callable, str] = {}
+
+
+async def load_plugin_list(
+    getter: Callable[[], List[Dict[str, Any]]],
+    refresh: bool
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Return a cached plugin list and its ETag, enumerating off the event
+    loop if needed. The ETag is None if enumeration failed."""
+    if refresh:
+        getter.cache_clear()
+        _PLUGIN_ETAGS.pop(getter, None)
+    if not getter.cache_info().currsize:
+        try:
+            await asyncio.to_thread(getter)
+        except Exception as e:
+            logger.error(f"Error enumerating Garak plugins: {e}")
+            return [], None
+    
+    plugins = getter()
+    etag = _PLUGIN_ETAGS.get(getter)
+    if etag is None:
+        # Include the getter's name so probe and detector tags never collide
+        digest = hashlib.blake2b(
+            getter.__name__.encode() + orjson.dumps(plugins), digest_size=16
+        ).hexdigest()
+        etag = _PLUGIN_ETAGS[getter] = f'"{digest}"'
+    return plugins, etag
+
+
+async def plugin_list_response(
+    request: Request,
+    key: str,
+    getter: Callable[[], List[Dict[str, Any]]],
+    refresh: bool
+) -> Response:
+    """Respond with a plugin list, or 304 if the client's copy is current"""
+    plugins, etag = await load_plugin_list(getter, refresh)
+    if etag is None:
+        return ORJSONResponse({key: plugins})
+    
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=300"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=headers)
+    return ORJSONResponse({key: plugins}, headers=headers)
+
+
 @app.get("/api/probes")
-async def list_probes():
-    """List available Garak probes"""
-    probes = garak_runner.get_available_probes()
-    return {"probes": probes}
+async def list_probes(
+    request: Request,
+    refresh: bool = False,
+    runner: GarakRunner = Depends(get_garak_runner)
+):
+    """List available Garak probes (pass ?refresh=1 to re-enumerate)"""
+    return await plugin_list_response(
+        request, "probes", runner.get_available_probes, refresh
+    )
 
 
 @app.get("/api/detectors")
-async def list_detectors():
-    """List available Garak detectors"""
-    detectors = garak_runner.get_available_detectors()
-    return {"detectors": detectors}
+async def list_detectors(
+    request: Request,
+    refresh: bool = False,
+    runner: GarakRunner = Depends(get_garak_runner)
+):
+    """List available Garak detectors (pass ?refresh=1 to re-enumerate)"""
+    return await plugin_list_response(
+        request, "detectors", runner.get_available_detectors, refresh
+    )
 
 
 @app.get("/api/scans")
 async def list_scans():
     """List all scan history"""
-    scans = load_scans()
+    scans = await load_scans()
     return {"scans": scans}
 
 
 @app.get("/api/scans/{scan_id}")
 async def get_scan(scan_id: str):
     """Get details of a specific scan"""
-    scans = load_scans()
-    scan = next((s for s in scans if s["id"] == scan_id), None)
+    scan = await get_scan_record(scan_id)
     if not scan:
         raise HTTPException(status_code=404, detail="Scan not found")
     return scan
@@ -420,32 +823,52 @@ async def get_scan(scan_id: str):
 @app.get("/api/scans/{scan_id}/report")
 async def get_scan_report(scan_id: str):
     """Get the HTML report for a specific scan"""
-    # Find the scan directory
-    scan_dir = DATA_DIR / scan_id
-    if not scan_dir.exists():
-        raise HTTPException(status_code=404, detail="Scan directory not found")
+    scan = await get_scan_record(scan_id)
+    report_file = ((scan or {}).get("results") or {}).get("report_html_path")
     
-    # Find HTML report
-    html_files = list(scan_dir.glob("report*.html"))
-    if not html_files:
-        raise HTTPException(status_code=404, detail="Report not found")
+    if not report_file or not os.path.isfile(report_file):
+        # Older scans don't record the report path, and a recorded path goes
+        # stale if the data directory moves; look for the report on disk
+        scan_dir = DATA_DIR / scan_id
+        if not scan_dir.exists():
+            raise HTTPException(status_code=404, detail="Scan directory not found")
+        _, html_files = GarakRunner.find_report_files(scan_dir)
+        if not html_files:
+            raise HTTPException(status_code=404, detail="Report not found")
+        report_file = html_files[0]
     
+    # Reports are written once when the scan completes
     return FileResponse(
-        html_files[0],
+        report_file,
         media_type="text/html",
-        filename=f"scan_{scan_id}_report.html"
+        filename=f"scan_{scan_id}_report.html",
+        headers={"Cache-Control": "public, max-age=3600, immutable"}
     )
 
 
 @app.websocket("/ws/scan")
-async def websocket_scan(websocket: WebSocket):
+async def websocket_scan(
+    websocket: WebSocket,
+    runner: GarakRunner = Depends(get_garak_runner)
+):
     """WebSocket endpoint for running scans"""
-    await websocket.accept()
-    active_connections.append(websocket)
+    # Use the first frame encoding the client offers that we support
+    subprotocol = next(
+        (p for p in websocket.scope.get("subprotocols", []) if p in WS_ENCODERS),
+        None
+    )
+    encode = WS_ENCODERS.get(subprotocol, orjson.dumps)
+    await websocket.accept(subprotocol=subprotocol)
+    if len(active_connections) >= MAX_WS_CONNECTIONS:
+        # 1013: Try Again Later
+        await websocket.close(code=1013, reason="Too many active scans")
+        return
+    active_connections.add(websocket)
+    scan_record = None
     
     try:
         # Receive scan request
-        data = await websocket.receive_json()
+        data = orjson.loads(await websocket.receive_text())
         
         logger.info(f"Received scan request for model: {data.get('model_name')}")
         logger.info(f"Probes: {data.get('probes')}")
@@ -462,45 +885,56 @@ async def websocket_scan(websocket: WebSocket):
             "status": "running"
         }
         
-        save_scan(scan_record)
+        await save_scan(scan_record)
         
         # Run the scan and get results
-        scan_results = await garak_runner.run_scan(
+        scan_results = await runner.run_scan(
             model_name=data["model_name"],
             probes=data["probes"],
             detectors=data.get("detectors"),
             websocket=websocket,
-            scan_id=scan_id
+            scan_id=scan_id,
+            encode=encode
         )
         
-        # Update scan status and save results
-        scans = load_scans()
-        for scan in scans:
-            if scan["id"] == scan_id:
-                scan["status"] = "completed"
-                if scan_results:  # Save results if they exist
-                    scan["results"] = scan_results
-                    logger.info(f"Saved results for scan {scan_id}: {scan_results.get('report_path')}")
-                break
-        with open(SCANS_FILE, 'w') as f:
-            json.dump(scans, f, indent=2)
+        # Update scan status and save results; scan_record is still the
+        # stored record, so no need to read it back
+        scan_record["status"] = "completed"
+        if scan_results:  # Save results if they exist
+            scan_record["results"] = scan_results
+            logger.info(f"Saved results for scan {scan_id}: {scan_results.get('report_path')}")
+        await save_scan(scan_record)
         
     except WebSocketDisconnect:
         logger.info("WebSocket disconnected")
+        # The scan's Garak process was stopped; record that it didn't finish
+        if scan_record and scan_record["status"] == "running":
+            scan_record["status"] = "cancelled"
+            await save_scan(scan_record)
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         try:
-            await websocket.send_json({
+            await websocket.send_bytes(encode({
                 "type": "error",
                 "message": str(e)
-            })
+            }))
         except:
             pass
     finally:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        active_connections.discard(websocket)
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Multiple workers need an import string; scan state shared between
+    # them lives in SQLite
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=WORKERS,
+        ws_ping_interval=20,
+        ws_ping_timeout=20,
+    )
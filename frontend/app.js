@@ -292,9 +292,15 @@ async function startScan() {
 }
 
 // WebSocket connection for scan
+const frameDecoder = new TextDecoder();
+
 function connectWebSocket(scanData) {
     console.log('Connecting to WebSocket with scan data:', scanData);
-    const ws = new WebSocket(`${WS_BASE_URL}/ws/scan`);
+    // Ask for MessagePack frames when the decoder loaded; otherwise the
+    // server falls back to UTF-8 encoded JSON
+    const protocols = window.MessagePack ? ['msgpack'] : [];
+    const ws = new WebSocket(`${WS_BASE_URL}/ws/scan`, protocols);
+    ws.binaryType = 'arraybuffer';
     state.ws = ws;
     
     ws.onopen = () => {
@@ -305,8 +311,19 @@ function connectWebSocket(scanData) {
     };
     
     ws.onmessage = (event) => {
-        const data = JSON.parse(event.data);
-        handleScanMessage(data);
+        let data;
+        if (ws.protocol === 'msgpack') {
+            data = MessagePack.decode(new Uint8Array(event.data));
+        } else {
+            const text = typeof event.data === 'string' ? event.data : frameDecoder.decode(event.data);
+            data = JSON.parse(text);
+        }
+        // Bursts of updates are coalesced into a single array frame
+        if (Array.isArray(data)) {
+            data.forEach(handleScanMessage);
+        } else {
+            handleScanMessage(data);
+        }
     };
     
     ws.onerror = (error) => {
@@ -329,6 +346,11 @@ function handleScanMessage(data) {
             addScanLog(data.message);
             break;
             
+        case 'log':
+            // Raw Garak output; may contain model text, so don't render as HTML
+            addScanLog(escapeHtml(data.message));
+            break;
+            
         case 'complete':
             updateScanProgress(100, 'Scan completed!');
             addScanLog('âœ“ Scan completed successfully', 'success');
@@ -348,6 +370,12 @@ function handleScanMessage(data) {
     }
 }
 
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
 // Update scan progress
 function updateScanProgress(progress, status) {
     document.getElementById('scanProgress').textContent = `${progress}%`;
@@ -72,7 +72,6 @@ REM Create data directory
 echo.
 echo Creating data directory...
 if not exist "backend\data\" mkdir backend\data
-echo [] > backend\data\scans.json
 echo [OK] Data directory ready
 
 echo.
@@ -67,7 +67,6 @@ fi
 echo ""
 echo "Creating data directory..."
 mkdir -p backend/data
-echo "[]" > backend/data/scans.json
 echo "[OK] Data directory ready"
 
 echo ""